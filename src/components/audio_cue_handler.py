@@ -1,6 +1,8 @@
 import reapy_boost as rpr
 import os
 import time
+from .cue_engine import CueEngine
+from .diagnostics import timed
 
 
 class AudioCueHandler:
@@ -19,7 +21,7 @@ class AudioCueHandler:
         print("Configuring Reaper...")
 
         # Configure Reaper
-        rpr.configure_reaper()
+        self._configure_reaper()
         os.environ["no_proxy"] = "localhost"
 
         if not self._verify_reaper_connection():
@@ -29,20 +31,44 @@ class AudioCueHandler:
                 "follow steps on https://github.com/RomeoDespres/reapy/issues/103"
             )
 
-        self.track_names = [track.name for track in self.project.tracks]
+        self._reset_project()
         print(f"✓ Found {len(self.track_names)} tracks: {self.track_names}")
 
-        # Stop playback if it was running
-        self.project.mute_all_tracks()
-        self.project.unselect_all_tracks()
-        self.project.unsolo_all_tracks()
-        if not self.project.is_stopped:
-            self.project.stop()
+        # Cache the regions and markers once, to switch scenarios without reloading
+        self.cue_engine = CueEngine(self.project)
+        try:
+            self._load_scenarios()
+        except Exception as e:
+            print(f"✗ Could not read project regions: {e}")
 
         # Mute all channels
         print("✓ Playback stopped, all channels muted an un-soloed.")
         print("✓ Reaper configured successfully")
 
+    @timed("audio_rpc_seconds")
+    def _configure_reaper(self):
+        """Configure Reaper for the distant API."""
+        rpr.configure_reaper()
+
+    @timed("audio_rpc_seconds")
+    def _reset_project(self):
+        """Read tracks and reset the project in a single batch of Reaper calls."""
+        with rpr.inside_reaper():
+            self.track_names = [track.name for track in self.project.tracks]
+
+            # Stop playback if it was running
+            self.project.mute_all_tracks()
+            self.project.unselect_all_tracks()
+            self.project.unsolo_all_tracks()
+            if not self.project.is_stopped:
+                self.project.stop()
+
+    @timed("audio_rpc_seconds")
+    def _load_scenarios(self):
+        """Read the project's regions and markers into the cue table."""
+        self.cue_engine.load()
+
+    @timed("audio_rpc_seconds")
     def _verify_reaper_connection(self):
         """Verify that Reaper is properly configured and accessible."""
         try:
@@ -61,38 +87,31 @@ class AudioCueHandler:
             print(f"✗ Reaper verification failed: {e}")
             return False
 
+    @timed("audio_rpc_seconds")
     def set_ne_loop(self):
         """Set the NE loop for the current project."""
-        # Find time to set loop length to, based on NE track content
-        loop_end_time = 0
-        for track in self.project.tracks:
-            if "NE" in track.name:
-                if len(track.items) > 0:
-                    # Get the maximum position + length of items in NE track
-                    loop_end_time = max(
-                        max([item.position + item.length for item in track.items]),
-                        loop_end_time,
-                    )
-        loop_end_time = loop_end_time + 1
-
-        # Set loop points
-        time_selection = self.project.time_selection
-        time_selection.start = 0
-        time_selection.end = loop_end_time
-
-        # Enable loop mode
-        self.project.cursor_position = time_selection.start
-        time_selection.loop()
-        print(f"✓ NE loop set from 0 to {loop_end_time} seconds.")
+        self.cue_engine.set_scenario_loop(None)
+
+    def get_scenarios(self):
+        """Get the names of the scenarios (named regions) in the project."""
+        return self.cue_engine.get_scenarios()
+
+    @timed("audio_rpc_seconds")
+    def set_scenario_loop(self, name: str = None):
+        """Set the loop to a scenario region of the current project, None for the NE loop."""
+        self.cue_engine.set_scenario_loop(name)
 
+    @timed("audio_rpc_seconds")
     def start_playback(self):
         """Start playback of the current project."""
         self.project.play()
 
+    @timed("audio_rpc_seconds")
     def stop_playback(self):
         """Stop playback of the current project."""
         self.project.stop()
 
+    @timed("audio_rpc_seconds")
     def toggle_content_mute(self, content_type: str = None):
         """Toggle mute for specific content type for playback."""
         if content_type not in self.AVAILABLE_CONTENT_TYPES:
@@ -123,7 +142,11 @@ def get_audio_cue_handler() -> AudioCueHandler:
 
 
 def main():
-    """Main function to demonstrate AudioCueHandler usage."""
+    """Main function to demonstrate AudioCueHandler usage.
+
+    Run from the repository root as a module, so the package imports resolve:
+    python -m src.components.audio_cue_handler
+    """
     print("=== AudioCueHandler Usage Example ===\n")
 
     # Create an instance of AudioCueHandler
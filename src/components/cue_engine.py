@@ -0,0 +1,73 @@
+import reapy_boost as rpr
+from typing import List, NamedTuple, Optional
+
+
+class Cue(NamedTuple):
+    """A region (start to end) or a marker (end is None) of the Reaper project."""
+
+    name: str
+    start: float
+    end: Optional[float] = None
+
+    @property
+    def is_region(self) -> bool:
+        return self.end is not None
+
+
+class CueEngine:
+    """
+    Cached table of the project's regions and markers, used to switch playback
+    between named test scenarios (regions) without reloading the project.
+    Besides the regions, the default NE loop scenario runs from the start of the
+    project to one second after the end of the last NE item, computed from the
+    current NE items each time it is selected.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.cues: List[Cue] = []
+
+    def load(self):
+        """Load the cue table in one batch of Reaper calls."""
+        with rpr.inside_reaper():
+            regions = [Cue(region.name, region.start, region.end) for region in self.project.regions]
+            markers = [Cue(marker.name, marker.position) for marker in self.project.markers]
+        self.cues = sorted(regions + markers, key=lambda cue: cue.start)
+        print(f"✓ Found {len(self.get_scenarios())} scenarios: {self.get_scenarios()}")
+
+    def get_scenarios(self) -> List[str]:
+        """Get the names of all scenarios (named regions) in project order."""
+        return [cue.name for cue in self.cues if cue.is_region and cue.name]
+
+    def get_scenario(self, name: str) -> Cue:
+        """Get the region of a scenario by name."""
+        for cue in self.cues:
+            if cue.is_region and cue.name == name:
+                return cue
+        raise ValueError(f"Invalid scenario: {name}. Available scenarios: {self.get_scenarios()}")
+
+    def _get_ne_loop(self) -> Cue:
+        """Get the NE loop from the current NE track content."""
+        loop_end_time = 0
+        for track in self.project.tracks:
+            if "NE" in track.name:
+                for item in track.items:
+                    loop_end_time = max(item.position + item.length, loop_end_time)
+        return Cue("NE loop", 0, loop_end_time + 1)
+
+    def set_scenario_loop(self, name: Optional[str]):
+        """Loop playback over a scenario (None for the NE loop), jumping there if already playing."""
+        scenario = self.get_scenario(name) if name is not None else None
+        with rpr.inside_reaper():
+            if scenario is None:
+                scenario = self._get_ne_loop()
+            was_playing = self.project.is_playing
+            if was_playing:
+                self.project.stop()
+            # Set both bounds in one write, so the range is never inverted in between
+            self.project.time_selection = scenario.start, scenario.end
+            self.project.cursor_position = scenario.start
+            self.project.time_selection.loop()
+            if was_playing:
+                self.project.play()
+        print(f"✓ Loop set to {scenario.name}, from {scenario.start} to {scenario.end} seconds.")
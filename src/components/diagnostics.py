@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+# Enable with MULTIZONE_DIAGNOSTICS=1, metrics are then served on localhost
+DIAGNOSTICS_ENABLED = os.environ.get("MULTIZONE_DIAGNOSTICS", "0") == "1"
+METRICS_PORT = int(os.environ.get("MULTIZONE_METRICS_PORT", "9108"))
+METRICS_PREFIX = "multizone_"
+# Counter rates are sampled every interval and smoothed with this weight for the newest sample
+RATE_INTERVAL = 1.0
+RATE_SMOOTHING = 0.5
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Diagnostics:
+    """
+    Lightweight counters and timings for the hot paths of the application.
+    All recording methods return immediately when diagnostics are disabled.
+    """
+
+    def __init__(self, enabled: bool = DIAGNOSTICS_ENABLED):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[MetricKey, float] = {}
+        # name/labels -> [count, total seconds, max seconds]
+        self._timings: Dict[MetricKey, List[float]] = {}
+        self._last_counters: Dict[MetricKey, float] = {}
+        self._last_sample_at = time.time()
+        self._rates: Dict[MetricKey, float] = {}
+        self._sampler = None
+        self._server = None
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> MetricKey:
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Increment a counter."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record the duration of one call."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            timing = self._timings.setdefault(key, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def _sample_rates(self):
+        """Update the smoothed per-second rate of each counter over the last interval."""
+        now = time.time()
+        with self._lock:
+            elapsed = max(now - self._last_sample_at, 1e-6)
+            for key, value in self._counters.items():
+                rate = (value - self._last_counters.get(key, 0)) / elapsed
+                previous = self._rates.get(key)
+                if previous is not None:
+                    rate = RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * previous
+                self._rates[key] = rate
+            self._last_counters = dict(self._counters)
+            self._last_sample_at = now
+
+    def _sample_rates_forever(self):
+        while True:
+            time.sleep(RATE_INTERVAL)
+            self._sample_rates()
+
+    def start_rate_sampler(self):
+        """Sample the counter rates in a separate thread, independent of who reads them."""
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_rates_forever, daemon=True)
+            self._sampler.start()
+
+    def rates(self) -> Dict[str, float]:
+        """Get the smoothed per-second rate of each counter."""
+        with self._lock:
+            rates = dict(self._rates)
+        return {self._format_key(key): rate for key, rate in rates.items()}
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        """Get call count, mean and max duration (ms) for each timing."""
+        with self._lock:
+            timings = {key: list(value) for key, value in self._timings.items()}
+        return {
+            self._format_key(key): {
+                "count": count,
+                "mean_ms": 1000 * total / count if count else 0.0,
+                "max_ms": 1000 * maximum,
+            }
+            for key, (count, total, maximum) in timings.items()
+        }
+
+    @staticmethod
+    def _format_key(key: MetricKey) -> str:
+        name, labels = key
+        if not labels:
+            return name
+        return name + "{" + ",".join(f'{label}="{value}"' for label, value in labels) + "}"
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {key: list(value) for key, value in self._timings.items()}
+
+        lines = [
+            f"# TYPE {METRICS_PREFIX}uptime_seconds gauge",
+            f"{METRICS_PREFIX}uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {METRICS_PREFIX}{name} counter")
+                typed.add(name)
+            lines.append(f"{METRICS_PREFIX}{self._format_key((name, labels))} {value}")
+        for (name, labels), (count, total, _) in sorted(timings.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {METRICS_PREFIX}{name} summary")
+                typed.add(name)
+            lines.append(f"{METRICS_PREFIX}{self._format_key((name + '_count', labels))} {count}")
+            lines.append(f"{METRICS_PREFIX}{self._format_key((name + '_sum', labels))} {total}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int = METRICS_PORT):
+        """Serve the metrics on http://localhost:<port>/metrics in a separate thread."""
+        if self._server is not None:
+            return
+        diagnostics = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = diagnostics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+        except OSError as e:
+            print(f"✗ Could not start metrics endpoint on port {port}: {e}")
+            return
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"✓ Metrics available on http://localhost:{port}/metrics")
+
+
+def timed(name: str):
+    """Decorator recording the duration of each call, labelled with the method name."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            diagnostics = get_diagnostics()
+            if not diagnostics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                diagnostics.observe(name, time.perf_counter() - start, method=func.__name__)
+
+        return wrapper
+
+    return decorator
+
+
+# Global diagnostics instance
+_diagnostics = None
+
+
+def get_diagnostics() -> Diagnostics:
+    """Get or create the global diagnostics instance."""
+    global _diagnostics
+    if _diagnostics is None:
+        _diagnostics = Diagnostics()
+        if _diagnostics.enabled:
+            _diagnostics.start_rate_sampler()
+            _diagnostics.start_http_server()
+    return _diagnostics
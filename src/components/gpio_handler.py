@@ -3,17 +3,32 @@ import serial.tools.list_ports
 import time
 import threading
 import subprocess
-from typing import Dict, List, Optional
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
 import streamlit as st
 import os
+from .diagnostics import get_diagnostics
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PATH_TO_SKETCH_DIR = os.path.join(CURRENT_DIR, "..", "arduino_gpio")
 
+# How often the device watcher polls the USB ports for unplug/replug (seconds)
+DEVICE_WATCH_INTERVAL = 0.25
+# Maximum time to wait for the sketch to acknowledge the reset handshake (seconds)
+HANDSHAKE_TIMEOUT = 3.0
+# Time to wait for the sketch to acknowledge a command before resending it (seconds)
+ACK_TIMEOUT = 0.5
+COMMAND_RETRIES = 3
+
+# USB identity (VID, PID, serial number) of the last Arduino connected, kept across handlers
+_known_device_id: Optional[Tuple[Optional[int], Optional[int], Optional[str]]] = None
+
 
 class GPIOHandler:
     def __init__(self, port: str = None, baudrate: int = 115200):
         """Initialize GPIO handler for Arduino communication."""
+        # Cached USB identity of the Arduino: (VID, PID, serial number)
+        self.device_id: Optional[Tuple[Optional[int], Optional[int], Optional[str]]] = None
         if not port:
             self.port = self._get_connected_arduino_port()
         else:
@@ -21,25 +36,105 @@ class GPIOHandler:
         self.baudrate = baudrate
         self.serial_conn: Optional[serial.Serial] = None
         self.is_connected = False
+        self.link_lost = False
         self.zone_talker_status = [False, False, False, False]  # 4 zones
         self.processing_status = False
+        # Processing state to restore once a lost link comes back
+        self._restore_processing = False
         self.read_thread = None
+        self.watch_thread = None
+        self.write_thread = None
         self.running = False
+        self.connect_error: Optional[str] = None
+        self._link_lock = threading.Lock()
+        # Commands waiting for the writer thread: key -> (command, expected ack, future)
+        self._pending_commands: Dict[str, Tuple[str, str, Future]] = {}
+        self._command_cond = threading.Condition()
+        self._in_flight_key: Optional[str] = None
+        self._expected_ack: Optional[str] = None
+        self._ack_event = threading.Event()
+        self.diagnostics = get_diagnostics()
 
     def _get_connected_arduino_port(self) -> str:
-        """Get the port of the connected Arduino."""
+        """Get the port of the connected Arduino, preferring the last known device."""
         try:
             ports = serial.tools.list_ports.comports()
+            self.device_id = _known_device_id
+            known_port = self._find_cached_device(ports)
+            if known_port:
+                return known_port.device
+            self.device_id = None
             for port in ports:
                 if "Arduino" in port.description or "USB Serial" in port.description:
+                    self._set_device_identity(port)
                     return port.device
             # Return None if no Arduino found
             st.error("No Arduino device found. Please connect your Arduino.")
         except Exception as e:
             st.error(f"Error detecting Arduino port: {e}")
 
+    def _find_cached_device(self, ports):
+        """Find the port matching the cached USB identity, if any."""
+        if self.device_id is None:
+            return None
+        for port in ports:
+            if (port.vid, port.pid, port.serial_number) == self.device_id:
+                return port
+        return None
+
+    def _set_device_identity(self, port):
+        """Cache the USB identity of a port, also for handlers created later."""
+        global _known_device_id
+        if port.vid is not None:
+            self.device_id = (port.vid, port.pid, port.serial_number)
+            _known_device_id = self.device_id
+
+    def _cache_device_identity(self):
+        """Cache the USB identity of the configured port."""
+        if self.device_id is not None:
+            return
+        for port in serial.tools.list_ports.comports():
+            if port.device == self.port:
+                self._set_device_identity(port)
+                return
+
+    def _open_serial(self):
+        """Open the serial link to the current port."""
+        self.serial_conn = serial.Serial(self.port, self.baudrate, timeout=0.1)
+
+    def _handshake(self, timeout: float = HANDSHAKE_TIMEOUT) -> bool:
+        """Reset the running sketch and wait for it to acknowledge.
+
+        RESET is repeated until the sketch answers, so this returns as soon as
+        the board has booted instead of after a fixed delay.
+        """
+        deadline = time.time() + timeout
+        next_reset = 0.0
+        while time.time() < deadline:
+            if time.time() >= next_reset:
+                self.serial_conn.write("RESET\n".encode("utf-8"))
+                next_reset = time.time() + 0.25
+            line = self.serial_conn.readline().decode("utf-8", errors="ignore").strip()
+            if "RESET_OK" in line:
+                return True
+        print("Arduino did not acknowledge reset")
+        return False
+
+    def _connect_failed(self, message: str) -> bool:
+        """Report why connecting failed, also for callers outside the script thread."""
+        self.connect_error = message
+        st.error(message)
+        return False
+
     def connect(self) -> bool:
         """Connect to Arduino via Serial."""
+        self.connect_error = None
+        if not self.port:
+            # The Arduino may have been plugged in after this handler was created
+            self.port = self._get_connected_arduino_port()
+            if not self.port:
+                self.connect_error = "No Arduino device found. Please connect your Arduino."
+                return False
         try:
             # First, compile and upload the sketch before opening serial connection
             print(f"Compiling Arduino sketch at: {PATH_TO_SKETCH_DIR}")
@@ -50,8 +145,7 @@ class GPIOHandler:
                 text=True,
             )
             if compile_result.returncode != 0:
-                st.error(f"Arduino compile failed: {compile_result.stderr}")
-                return False
+                return self._connect_failed(f"Arduino compile failed: {compile_result.stderr}")
 
             print(f"Uploading to port: {self.port}")
             upload_result = subprocess.run(
@@ -69,46 +163,52 @@ class GPIOHandler:
                 text=True,
             )
             if upload_result.returncode != 0:
-                st.error(f"Arduino upload failed: {upload_result.stderr}")
-                return False
+                return self._connect_failed(f"Arduino upload failed: {upload_result.stderr}")
 
             # Wait for Arduino to reset after upload
             time.sleep(3)
 
             # Now open the serial connection
-            self.serial_conn = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(2)  # Wait for Arduino to initialize
-
-            # Clear any pending data from Arduino
-            if self.serial_conn.in_waiting:
-                self.serial_conn.reset_input_buffer()
+            self._cache_device_identity()
+            self._open_serial()
 
             # Send a reset command to clear any running sketch process
             try:
-                self.serial_conn.write("RESET\n".encode("utf-8"))
-                response = self.serial_conn.readline().decode("utf-8").strip()
-                if "RESET_OK" not in response:
-                    print(f"Arduino reset response: {response}")
-                time.sleep(0.5)  # Wait for the reset to take effect
+                self._handshake()
             except Exception as e:
                 print(f"Error sending reset command: {e}")
 
+            self.processing_status = False
             self.is_connected = True
+            self.link_lost = False
             self.running = True
             self.start_reading()
+            self.start_writing()
+            self.start_watching()
             return True
         except Exception as e:
-            st.error(f"Failed to connect to Arduino: {e}")
-            return False
+            return self._connect_failed(f"Failed to connect to Arduino: {e}")
 
     def disconnect(self):
         """Disconnect from Arduino."""
         self.running = False
+        with self._command_cond:
+            for _, _, future in self._pending_commands.values():
+                future.cancel()
+            self._pending_commands.clear()
+            self._command_cond.notify_all()
         if self.read_thread and self.read_thread.is_alive():
             self.read_thread.join(timeout=1)
-        if self.serial_conn and self.serial_conn.is_open:
-            self.serial_conn.close()
-        self.is_connected = False
+        if self.write_thread and self.write_thread.is_alive():
+            self.write_thread.join(timeout=1)
+        if self.watch_thread and self.watch_thread.is_alive():
+            self.watch_thread.join(timeout=1)
+        # Waits for a reconnect in progress, which then sees running is False
+        with self._link_lock:
+            if self.serial_conn and self.serial_conn.is_open:
+                self.serial_conn.close()
+            self.is_connected = False
+            self.link_lost = False
 
     def start_reading(self):
         """Start reading from Arduino in a separate thread."""
@@ -118,54 +218,226 @@ class GPIOHandler:
             )
             self.read_thread.start()
 
+    def start_writing(self):
+        """Start sending queued commands to Arduino in a separate thread."""
+        if not self.write_thread or not self.write_thread.is_alive():
+            self.write_thread = threading.Thread(
+                target=self._write_to_arduino, daemon=True
+            )
+            self.write_thread.start()
+
+    def start_watching(self):
+        """Start watching for the Arduino being unplugged and replugged."""
+        if not self.watch_thread or not self.watch_thread.is_alive():
+            self.watch_thread = threading.Thread(
+                target=self._watch_device, daemon=True
+            )
+            self.watch_thread.start()
+
     def _read_from_arduino(self):
         """Read GPIO status from Arduino continuously."""
         while self.running and self.is_connected:
             try:
-                if self.serial_conn and self.serial_conn.in_waiting > 0:
-                    line = self.serial_conn.readline().decode("utf-8").strip()
+                self.diagnostics.increment("serial_reader_wakeups_total")
+                # Drain every complete line so acknowledgements are not queued
+                # behind talker updates
+                while self.serial_conn and self.serial_conn.in_waiting > 0:
+                    raw_line = self.serial_conn.readline()
+                    self.diagnostics.increment("serial_bytes_total", len(raw_line))
+                    self.diagnostics.increment("serial_frames_total")
+                    # Corrupted bytes (e.g. after a USB glitch) are handled as parse errors
+                    line = raw_line.decode("utf-8", errors="replace").strip()
                     self._parse_arduino_data(line)
                     # print(f"Received from Arduino: {line}")
                 time.sleep(0.1)  # Small delay to prevent excessive CPU usage
+            except (serial.SerialException, OSError) as e:
+                self.diagnostics.increment("serial_errors_total")
+                # Device is gone, the watcher restores the link when it returns
+                print(f"Lost connection to Arduino: {e}")
+                self._mark_link_lost()
             except Exception as e:
                 print(f"Error reading from Arduino: {e}")
                 time.sleep(1)
 
+    def _write_to_arduino(self):
+        """Send queued commands one at a time, waiting for each acknowledgement."""
+        while self.running:
+            with self._command_cond:
+                while self.running and not self._pending_commands:
+                    self._command_cond.wait(timeout=0.5)
+                if not self._pending_commands:
+                    continue
+                key = next(iter(self._pending_commands))
+                command, ack, future = self._pending_commands.pop(key)
+                self._in_flight_key = key
+            try:
+                result = self._send_with_ack(command, ack)
+            finally:
+                with self._command_cond:
+                    self._in_flight_key = None
+            future.set_result(result)
+
+    def _send_with_ack(self, command: str, ack: str) -> bool:
+        """Write a command and wait for its acknowledgement, resending on timeout."""
+        for attempt in range(COMMAND_RETRIES):
+            if not self.is_connected or not self.serial_conn:
+                break
+            self._ack_event.clear()
+            self._expected_ack = ack
+            try:
+                self.serial_conn.write(f"{command}\n".encode("utf-8"))
+            except Exception as e:
+                print(f"Failed to send command to Arduino: {e}")
+            if self._ack_event.wait(ACK_TIMEOUT):
+                self._expected_ack = None
+                return True
+            print(f"No acknowledgement for {command} (attempt {attempt + 1}/{COMMAND_RETRIES})")
+        self._expected_ack = None
+        return False
+
+    def _queue_command(self, key: str, command: str, ack: str) -> Future:
+        """Queue a command for the writer thread.
+
+        A command that is still waiting to be sent is replaced (and its future
+        cancelled) by a newer command with the same key, so rapid toggles
+        collapse into the last one.
+        """
+        future = Future()
+        with self._command_cond:
+            previous = self._pending_commands.get(key)
+            if previous:
+                previous[2].cancel()
+            self._pending_commands[key] = (command, ack, future)
+            self._command_cond.notify()
+        return future
+
+    def _find_configured_port(self, ports) -> Optional[str]:
+        """Find the configured port when the USB identity is unknown (e.g. a udev symlink)."""
+        if any(port.device == self.port for port in ports) or os.path.exists(self.port):
+            return self.port
+        return None
+
+    def _watch_device(self):
+        """Detect unplug/replug of the cached device and restore the link.
+
+        Without a known USB identity an unplug is only detected by the reader
+        failing, and the link is restored once the configured port is back.
+        """
+        while self.running:
+            try:
+                ports = serial.tools.list_ports.comports()
+                if self.device_id is not None:
+                    cached_port = self._find_cached_device(ports)
+                    port = cached_port.device if cached_port else None
+                    if port is None and self.is_connected:
+                        print("Arduino unplugged, waiting for it to come back...")
+                        self._mark_link_lost()
+                else:
+                    port = self._find_configured_port(ports)
+                if port is not None and self.link_lost:
+                    self._reconnect(port)
+            except Exception as e:
+                print(f"Error watching Arduino device: {e}")
+            time.sleep(DEVICE_WATCH_INTERVAL)
+
+    def _mark_link_lost(self):
+        """Close the serial link after the device disappeared."""
+        with self._link_lock:
+            if not self.is_connected:
+                return
+            self.is_connected = False
+            self.link_lost = True
+            self.zone_talker_status = [False, False, False, False]
+            # Nothing is confirmed while the board is gone
+            self._restore_processing = self.processing_status
+            self.processing_status = False
+            try:
+                if self.serial_conn and self.serial_conn.is_open:
+                    self.serial_conn.close()
+            except Exception:
+                pass
+
+    def _reconnect(self, port: str):
+        """Reopen the serial link to a replugged Arduino, without re-uploading."""
+        with self._link_lock:
+            if not self.running:
+                return
+            self.port = port
+            try:
+                self._open_serial()
+                if not self._handshake():
+                    self.serial_conn.close()
+                    return
+            except Exception as e:
+                print(f"Failed to reopen Arduino on {port}: {e}")
+                return
+            if not self.running:
+                # Disconnected while the handshake was running
+                self.serial_conn.close()
+                return
+            self.is_connected = True
+            self.link_lost = False
+        print(f"✓ Arduino reconnected on {port}")
+        self.start_reading()
+        if self._restore_processing:
+            self.send_processing_command(True)
+
     def _parse_arduino_data(self, data: str):
         """Parse incoming data from Arduino.
-        Expected format: "TALKER:0,1,0,1" where 1=active, 0=inactive for each zone
+        Expected format: "TALKER:0,1,0,1" where 1=active, 0=inactive for each zone,
+        or "PROCESS_ON"/"PROCESS_OFF" acknowledging a processing command.
         """
         try:
+            if "\ufffd" in data:
+                # Line contained bytes that are not valid UTF-8
+                self.diagnostics.increment("serial_parse_errors_total")
+                return
             if data.startswith("TALKER:"):
                 status_str = data.replace("TALKER:", "")
                 status_values = status_str.split(",")
                 if len(status_values) == 4:
                     self.zone_talker_status = [bool(int(val)) for val in status_values]
+                else:
+                    self.diagnostics.increment("serial_parse_errors_total")
+            elif data in ("PROCESS_ON", "PROCESS_OFF"):
+                self.processing_status = data == "PROCESS_ON"
+            if data and data == self._expected_ack:
+                self._ack_event.set()
         except Exception as e:
+            self.diagnostics.increment("serial_parse_errors_total")
             print(f"Error parsing Arduino data: {e}")
 
-    def send_processing_command(self, enable: bool):
-        """Send processing on/off command to Arduino."""
+    def send_processing_command(self, enable: bool) -> Future:
+        """Queue a processing on/off command for Arduino.
+
+        Returns immediately with a future that resolves to True once the board
+        acknowledged the command, or False if it never did. The processing
+        status is only updated from the acknowledgement.
+        """
         if not self.is_connected or not self.serial_conn:
-            return False
+            future = Future()
+            future.set_result(False)
+            return future
 
-        try:
-            command = f"PROCESS:{'1' if enable else '0'}\n"
-            self.serial_conn.write(command.encode("utf-8"))
-            self.processing_status = enable
-            return True
-        except Exception as e:
-            st.error(f"Failed to send command to Arduino: {e}")
-            return False
+        return self._queue_command(
+            "PROCESS",
+            f"PROCESS:{'1' if enable else '0'}",
+            "PROCESS_ON" if enable else "PROCESS_OFF",
+        )
 
     def get_zone_talker_status(self) -> List[bool]:
         """Get current talker status for all zones."""
         return self.zone_talker_status.copy()
 
     def get_processing_status(self) -> bool:
-        """Get current processing status."""
+        """Get processing status as last confirmed by Arduino."""
         return self.processing_status
 
+    def is_processing_pending(self) -> bool:
+        """Check whether a processing command is still waiting for confirmation."""
+        with self._command_cond:
+            return "PROCESS" in self._pending_commands or self._in_flight_key == "PROCESS"
+
 
 # Global GPIO handler instance
 _gpio_handler = None
@@ -1,11 +1,78 @@
 import streamlit as st
-from .gpio_handler import get_gpio_handler
-from .audio_cue_handler import get_audio_cue_handler
+from .diagnostics import get_diagnostics
+import threading
 import time
 import random
 
+# Reaper and Arduino connections made in the background, shared by all sessions.
+# The hardware modules are only imported once they are needed, so the page renders immediately.
+_audio_connection = {"status": "idle", "handler": None, "error": None}
+_gpio_connection = {"status": "idle", "handler": None, "error": None}
+_connection_lock = threading.Lock()
+
+
+def _connect_in_background(connection, connect):
+    """Start a connection in a separate thread, unless already connecting or connected."""
+    with _connection_lock:
+        if connection["status"] in ("connecting", "connected"):
+            return
+        connection["status"] = "connecting"
+        connection["error"] = None
+    threading.Thread(target=_run_connect, args=(connection, connect), daemon=True).start()
+
+
+def _run_connect(connection, connect):
+    """Run a connect function and record its outcome in the connection status."""
+    try:
+        handler = connect()
+        with _connection_lock:
+            connection["handler"] = handler
+            connection["status"] = "connected"
+    except Exception as e:
+        with _connection_lock:
+            connection["error"] = str(e)
+            connection["status"] = "failed"
+
+
+def _connect_audio():
+    """Import the audio cue handler and connect to Reaper."""
+    from .audio_cue_handler import get_audio_cue_handler
+
+    return get_audio_cue_handler()
+
+
+def _connect_gpio():
+    """Import the GPIO handler, upload the sketch and connect to Arduino."""
+    handler = _get_gpio_handler()
+    if not handler.connect():
+        raise ConnectionError(handler.connect_error or "Failed to connect to Arduino")
+    return handler
+
+
+def _get_gpio_handler():
+    """Import the GPIO handler module on first use and get the handler."""
+    from .gpio_handler import get_gpio_handler
+
+    return get_gpio_handler()
+
 
 def create_multizone_grid():
+    diagnostics = get_diagnostics()
+    run_started = time.perf_counter()
+    try:
+        auto_refresh = _render_multizone_grid(diagnostics)
+    finally:
+        # Script run duration, also for runs ending in st.rerun() but excluding the auto-refresh delay
+        diagnostics.observe("script_run_seconds", time.perf_counter() - run_started)
+
+    # Auto-refresh for real-time updates (when processing is ON or awaiting a confirmation/connection)
+    if auto_refresh:
+        time.sleep(0.5)  # Refresh every 500ms
+        st.rerun()
+
+
+def _render_multizone_grid(diagnostics) -> bool:
+    """Render the grid and controls, returning whether the page should auto-refresh."""
     # Initialize session state for active zone (only one can be active)
     if "active_zone" not in st.session_state:
         st.session_state.active_zone = None
@@ -30,6 +97,18 @@ def create_multizone_grid():
     if "audio_playback" not in st.session_state:
         st.session_state.audio_playback = False
 
+    # Initialize selected test scenario (Reaper region), None loops the NE content
+    if "scenario" not in st.session_state:
+        st.session_state.scenario = None
+
+    # Last processing command sent to Arduino, checked for its acknowledgement
+    if "processing_command" not in st.session_state:
+        st.session_state.processing_command = None
+
+    # Processing state requested from Arduino and not yet confirmed
+    if "processing_target" not in st.session_state:
+        st.session_state.processing_target = None
+
     # Initialize GPIO connection state
     if "gpio_connected" not in st.session_state:
         st.session_state.gpio_connected = False
@@ -45,15 +124,35 @@ def create_multizone_grid():
     if "last_artificial_update" not in st.session_state:
         st.session_state.last_artificial_update = time.time()
 
-    # Get GPIO handler
-    gpio_handler = get_gpio_handler()
-    # Get Audio Cue handler
-    try:
-        audio_handler = get_audio_cue_handler()
-        st.session_state.audio_connected = True
-    except Exception as e:
-        st.session_state.audio_connected = False
-        st.info("Audio connection not established, error: " + str(e))
+    # Get GPIO handler, only created once connecting to Arduino in the background
+    gpio_status = _gpio_connection["status"]
+    st.session_state.gpio_connected = gpio_status == "connected"
+    gpio_handler = _gpio_connection["handler"] if st.session_state.gpio_connected else None
+
+    # Show the processing state the Arduino confirmed, the requested one is kept apart
+    processing_pending = (
+        st.session_state.gpio_connected and gpio_handler.is_processing_pending()
+    )
+    if st.session_state.gpio_connected:
+        st.session_state.goodix_processing = gpio_handler.get_processing_status()
+    if not processing_pending:
+        st.session_state.processing_target = None
+
+    # Report a processing command the Arduino never acknowledged
+    processing_command = st.session_state.processing_command
+    if processing_command is not None and processing_command.done():
+        st.session_state.processing_command = None
+        if not processing_command.cancelled() and not processing_command.result():
+            st.error("Failed to send command to Arduino")
+
+    # Get Audio Cue handler, connecting to Reaper in the background on first run
+    if _audio_connection["status"] == "idle":
+        _connect_in_background(_audio_connection, _connect_audio)
+    audio_status = _audio_connection["status"]
+    audio_handler = _audio_connection["handler"]
+    st.session_state.audio_connected = audio_status == "connected"
+    if audio_status == "failed":
+        st.info("Audio connection not established, error: " + str(_audio_connection["error"]))
 
     # Generate artificial talker signals if not connected to Arduino
     if not st.session_state.gpio_connected:
@@ -186,6 +285,8 @@ def create_multizone_grid():
     # Goodix processing button
     with col1:
         goodix_status = "ON" if st.session_state.goodix_processing else "OFF"
+        if st.session_state.processing_target is not None:
+            goodix_status += f" → {'ON' if st.session_state.processing_target else 'OFF'} ⏳"
         goodix_button_type = (
             "primary" if st.session_state.goodix_processing else "secondary"
         )
@@ -195,19 +296,20 @@ def create_multizone_grid():
             key="goodix_btn",
             type=goodix_button_type,
         ):
-            new_status = not st.session_state.goodix_processing
-            st.session_state.goodix_processing = new_status
+            # Toggle from the pending request, if any, so rapid clicks alternate
+            current_status = st.session_state.processing_target
+            if current_status is None:
+                current_status = st.session_state.goodix_processing
+            new_status = not current_status
 
-            # Send command to Arduino if connected
+            # Queue command for Arduino if connected, the state is confirmed asynchronously
             if st.session_state.gpio_connected:
-                success = gpio_handler.send_processing_command(new_status)
-                if success:
-                    st.success(
-                        f"Processing {'enabled' if new_status else 'disabled'} on Arduino"
-                    )
-                else:
-                    st.error("Failed to send command to Arduino")
+                st.session_state.processing_target = new_status
+                st.session_state.processing_command = gpio_handler.send_processing_command(
+                    new_status
+                )
             else:
+                st.session_state.goodix_processing = new_status
                 # Show artificial feedback when not connected
                 st.info(
                     f"Artificial mode: Processing {'enabled' if new_status else 'disabled'}"
@@ -292,14 +394,19 @@ def create_multizone_grid():
 
     # Arduino connection in center-left
     with col2:
-        if not st.session_state.gpio_connected:
+        if gpio_status == "connecting":
+            st.markdown(
+                "<div style='text-align: center; font-size: 12px;'>⏳ Connecting Arduino...</div>",
+                unsafe_allow_html=True,
+            )
+        elif not st.session_state.gpio_connected:
+            if gpio_status == "failed":
+                st.error(str(_gpio_connection["error"]))
             if st.button(
                 "Connect Arduino", key="connect_gpio", help="Connect to Arduino via USB"
             ):
-                if gpio_handler.connect():
-                    st.session_state.gpio_connected = True
-                    st.success("Connected!")
-                    st.rerun()
+                _connect_in_background(_gpio_connection, _connect_gpio)
+                st.rerun()
         else:
             status_color = "🟢" if gpio_handler.is_connected else "🔴"
             st.markdown(
@@ -311,25 +418,27 @@ def create_multizone_grid():
                 "Disconnect", key="disconnect_gpio", help="Disconnect from Arduino"
             ):
                 gpio_handler.disconnect()
+                with _connection_lock:
+                    _gpio_connection["status"] = "idle"
                 st.session_state.gpio_connected = False
                 st.info("Disconnected")
                 st.rerun()
 
     # Audio playback button in center-right
     with col4:
-        if not st.session_state.audio_connected:
+        if audio_status == "connecting":
+            st.markdown(
+                "<div style='text-align: center; font-size: 12px;'>⏳ Connecting audio...</div>",
+                unsafe_allow_html=True,
+            )
+        elif not st.session_state.audio_connected:
             if st.button(
                 "Connect Audio",
                 key="connect_audio",
                 help="Connect to Reaper for audio playback",
             ):
-                try:
-                    audio_handler = get_audio_cue_handler()
-                    st.session_state.audio_connected = True
-                    st.success("Connected!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Failed to connect: {e}")
+                _connect_in_background(_audio_connection, _connect_audio)
+                st.rerun()
         else:
             # Show audio status when connected
             if not st.session_state.audio_playback:
@@ -344,7 +453,7 @@ def create_multizone_grid():
                     "Start Audio", key="start_audio", help="Start audio playback"
                 ):
                     try:
-                        audio_handler.set_ne_loop()
+                        audio_handler.set_scenario_loop(st.session_state.scenario)
                         audio_handler.start_playback()
                         st.session_state.audio_playback = True
                         st.success("Audio started!")
@@ -369,6 +478,26 @@ def create_multizone_grid():
                     except Exception as e:
                         st.error(f"Failed to stop audio: {e}")
 
+    # Scenario selection, switching the loop right away when already playing
+    if st.session_state.audio_connected and audio_handler.get_scenarios():
+        scenario_options = [None] + audio_handler.get_scenarios()
+        if st.session_state.scenario not in scenario_options:
+            st.session_state.scenario = None
+        selected_scenario = st.selectbox(
+            "Scenario",
+            scenario_options,
+            index=scenario_options.index(st.session_state.scenario),
+            format_func=lambda name: name if name else "NE loop",
+            key="scenario_select",
+        )
+        if selected_scenario != st.session_state.scenario:
+            st.session_state.scenario = selected_scenario
+            if st.session_state.audio_playback:
+                try:
+                    audio_handler.set_scenario_loop(selected_scenario)
+                except Exception as e:
+                    st.error(f"Failed to switch scenario: {e}")
+
     # Status indicator at the bottom
     status_messages = []
 
@@ -377,12 +506,18 @@ def create_multizone_grid():
     elif not st.session_state.goodix_processing:
         status_messages.append("⏸️ Talker monitoring disabled")
 
+    if st.session_state.gpio_connected and gpio_handler.link_lost:
+        status_messages.append("⚠️ Arduino link lost - waiting for it to reconnect")
+
     if st.session_state.background_noise:
         status_messages.append("🔊 Background noise enabled")
 
     if st.session_state.audio_playback:
         status_messages.append("🎵 Audio playback active")
 
+    if st.session_state.scenario:
+        status_messages.append(f"🎬 Scenario: {st.session_state.scenario}")
+
     if status_messages:
         st.markdown(
             f"<div style='text-align: center; font-size: 10px; color: #666; margin-top: 10px;'>"
@@ -390,7 +525,36 @@ def create_multizone_grid():
             unsafe_allow_html=True,
         )
 
-    # Auto-refresh for real-time updates (only when processing is ON)
-    if st.session_state.goodix_processing:
-        time.sleep(0.5)  # Refresh every 500ms
-        st.rerun()
+    # Diagnostics panel, only when enabled with MULTIZONE_DIAGNOSTICS=1
+    if diagnostics.enabled:
+        with st.expander("Diagnostics", expanded=False):
+            rates = diagnostics.rates()
+            if rates:
+                st.table(
+                    [
+                        {"Counter": name, "Per second": f"{rate:.1f}"}
+                        for name, rate in sorted(rates.items())
+                    ]
+                )
+            timings = diagnostics.timings()
+            if timings:
+                st.table(
+                    [
+                        {
+                            "Timing": name,
+                            "Calls": int(timing["count"]),
+                            "Mean (ms)": f"{timing['mean_ms']:.1f}",
+                            "Max (ms)": f"{timing['max_ms']:.1f}",
+                        }
+                        for name, timing in sorted(timings.items())
+                    ]
+                )
+
+    arduino_link_lost = st.session_state.gpio_connected and gpio_handler.link_lost
+    return bool(
+        st.session_state.goodix_processing
+        or processing_pending
+        or arduino_link_lost
+        or audio_status == "connecting"
+        or gpio_status == "connecting"
+    )
@@ -0,0 +1,74 @@
+import pytest
+
+from src.components import gpio_handler
+from src.components.gpio_handler import GPIOHandler
+
+ACKS = {"PROCESS:1": "PROCESS_ON", "PROCESS:0": "PROCESS_OFF"}
+
+
+class FakeSerial:
+    """Serial link answering commands like the sketch, after `ignore` unanswered writes."""
+
+    def __init__(self, handler: GPIOHandler, ignore: int = 0):
+        self.handler = handler
+        self.ignore = ignore
+        self.writes = []
+        self.is_open = True
+
+    def write(self, data: bytes):
+        command = data.decode("utf-8").strip()
+        self.writes.append(command)
+        if len(self.writes) > self.ignore:
+            self.handler._parse_arduino_data(ACKS[command])
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(gpio_handler, "ACK_TIMEOUT", 0.01)
+    handler = GPIOHandler(port="/dev/ttyFAKE")
+    handler.is_connected = True
+    handler.running = True
+    yield handler
+    handler.disconnect()
+
+
+def test_pending_command_is_replaced_and_cancelled(handler):
+    handler.serial_conn = FakeSerial(handler)
+    first = handler.send_processing_command(True)
+    second = handler.send_processing_command(False)
+    assert first.cancelled()
+    assert handler.is_processing_pending()
+
+    handler.start_writing()
+    assert second.result(timeout=1) is True
+    assert handler.serial_conn.writes == ["PROCESS:0"]
+    assert handler.get_processing_status() is False
+    assert not handler.is_processing_pending()
+
+
+def test_command_is_resent_until_acknowledged(handler):
+    handler.serial_conn = FakeSerial(handler, ignore=1)
+    handler.start_writing()
+    assert handler.send_processing_command(True).result(timeout=1) is True
+    assert handler.serial_conn.writes == ["PROCESS:1", "PROCESS:1"]
+    assert handler.get_processing_status() is True
+
+
+def test_unacknowledged_command_fails_after_retries(handler):
+    handler.serial_conn = FakeSerial(handler, ignore=gpio_handler.COMMAND_RETRIES)
+    handler.start_writing()
+    assert handler.send_processing_command(True).result(timeout=1) is False
+    assert handler.serial_conn.writes == ["PROCESS:1"] * gpio_handler.COMMAND_RETRIES
+    assert handler.get_processing_status() is False
+
+
+def test_disconnect_cancels_pending_commands(handler):
+    handler.serial_conn = FakeSerial(handler)
+    future = handler.send_processing_command(True)
+    handler.disconnect()
+    assert future.cancelled()
+    assert not handler.is_processing_pending()
+    assert handler.serial_conn.writes == []